@@ -36,6 +36,10 @@ Reference/API
 
 '''
 
+from functools import lru_cache
+from itertools import chain, repeat
+from math import isqrt
+
 __version__ = '2021.10.11'
 
 __all__ = [
@@ -79,31 +83,94 @@ def index(pairs):
 
     if isinstance(pairs, int):
         return [(i, i) for i in range(pairs)]
+    elif isinstance(pairs, (list, tuple)):
+        index = _index_dense(pairs)
+        if index is not None:
+            return index
+    idict = {}
+    idict_get = idict.get
+    index = []
+    for i, pair in enumerate(pairs):
+        if len(pair) != 2:
+            raise ValueError(f'{pair} at position {i} is not a pair')
+        a, b = pair
+        ia = idict_get(a)
+        if ia is None:
+            ia = idict[a] = len(idict)
+        ib = idict_get(b)
+        if ib is None:
+            ib = idict[b] = len(idict)
+        index.append((ia, ib) if ia <= ib else (ib, ia))
+    return index
+
+
+def _index_dense(pairs):
+    '''index() for integer pairs that are already matrix indices
+
+    Returns ``None`` if the integers are not numbered densely in order of
+    first appearance, in which case the general method must be used.
+
+    '''
+    top = 0
+    index = []
+    append = index.append
+    try:
+        for a, b in pairs:
+            if type(a) is not int or type(b) is not int:
+                return None
+            if a >= top or b >= top:
+                if a == top:
+                    top += 1
+                elif a > top:
+                    return None
+                if b == top:
+                    top += 1
+                elif b > top:
+                    return None
+            if a <= b:
+                if a < 0:
+                    return None
+                append((a, b))
+            else:
+                if b < 0:
+                    return None
+                append((b, a))
+    except (TypeError, ValueError):
+        return None
+    return index
+
+
+@lru_cache(maxsize=128)
+def _index_cached(pairs):
+    '''cached index() for a tuple of hashable pairs'''
+    return tuple(index(pairs))
+
+
+@lru_cache(maxsize=128)
+def _cl_indices_cached(n, new):
+    '''cached cl_indices() returning tuples'''
+    if not new:
+        ii = tuple(chain.from_iterable(repeat(i, n-i) for i in range(n)))
     else:
-        idict = {}
-        index = []
-        for i, pair in enumerate(pairs):
-            if len(pair) != 2:
-                raise ValueError(f'{pair} at position {i} is not a pair')
-            a, b = pair
-            if a not in idict:
-                idict[a] = len(idict)
-            if b not in idict:
-                idict[b] = len(idict)
-            index.append(tuple(sorted([idict[a], idict[b]])))
-        return index
+        ii = tuple(chain.from_iterable(range(n-i) for i in range(n)))
+    jj = tuple(chain.from_iterable(range(i, n) for i in range(n)))
+    return ii, jj
+
+
+def _flat_positions(x, n, new):
+    '''flat positions of sorted index pairs in synalm/synfast order'''
+    if new is False:
+        return [i*n - i*(i-1)//2 + j - i for i, j in x]
+    else:
+        return [(j-i)*n - (j-i)*(j-i-1)//2 + i for i, j in x]
 
 
 def cl_indices(n, new=True):
     '''return array indices in healpy synalm/synfast order
 
     '''
-    ii, jj = [], []
-    for i in range(n):
-        for j in range(i, n):
-            ii.append(i if new is False else j-i)
-            jj.append(j)
-    return ii, jj
+    ii, jj = _cl_indices_cached(n, new is not False)
+    return list(ii), list(jj)
 
 
 def enumerate_cls(cls, new=True):
@@ -113,10 +180,10 @@ def enumerate_cls(cls, new=True):
     the associated cl at that position.
 
     '''
-    n = int((2*len(cls))**0.5)
+    n = isqrt(2*len(cls))
     if len(cls) != n*(n+1)//2:
         raise TypeError('length of cls array is not a triangle number')
-    return zip(*cl_indices(n), cls)
+    return zip(*_cl_indices_cached(n, True), cls)
 
 
 def sortcl(cls, pairs, new=True):
@@ -170,21 +237,22 @@ def sortcl(cls, pairs, new=True):
     if len(cls) != len(pairs):
         raise ValueError('cls and pairs have different length')
 
-    x = index(pairs)
+    try:
+        x = _index_cached(tuple(pairs))
+    except TypeError:
+        # pairs are not hashable and cannot be cached
+        x = index(pairs)
+
+    # index pairs are sorted, so the largest column index gives the size
+    n = max((j for i, j in x), default=0) + 1
 
-    n = 0
-    for i, j in x:
-        n = max([i, j, n])
-    n += 1
+    dest = _flat_positions(x, n, new)
 
-    sorted_cls = []
+    sorted_cls = [None]*(n*(n+1)//2)
 
-    for pos in zip(*cl_indices(n, new)):
-        try:
-            k = x.index(pos)
-        except ValueError:
-            sorted_cls.append(None)
-        else:
-            sorted_cls.append(cls[k])
+    # scatter cls into their flat position in the triangular order; go
+    # backwards so that the first occurrence of a repeated pair wins
+    for k in reversed(range(len(dest))):
+        sorted_cls[dest[k]] = cls[k]
 
     return sorted_cls